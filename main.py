@@ -8,8 +8,20 @@ import pandas as pd
 import requests
 import json
 import numpy as np
-import plotly.graph_objects as go
 import os # For path joining if using local HTML file for component
+import collections
+import functools
+import hashlib
+import html
+import re
+import time
+import types
+import zlib
+
+try:
+    import orjson # Optional: much faster figure serialization than the stdlib encoder
+except ImportError:
+    orjson = None
 
 # Set page configuration with custom theme
 st.set_page_config(
@@ -24,140 +36,218 @@ st.set_page_config(
     }
 )
 
-# Custom CSS for production-grade UI (same as before)
-st.markdown("""
-<style>
-    /* Main app styling */
-    .main {
-        background-color: #f5f7f9;
-        color: #1e1e1e;
-    }
-    .main h1 {
-        color: #1e3a8a; /* Darker blue */
-        font-weight: 600;
-        font-size: 2.5rem;
-        margin-bottom: 0.5rem;
-        padding-bottom: 1rem;
-        border-bottom: 1px solid #e5e7eb; /* Light gray border */
-    }
-    .element-card {
-        background-color: white;
-        border-radius: 10px;
-        padding: 1.5rem;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        margin-bottom: 1rem;
-        border-left: 5px solid var(--category-color, #3b82f6); /* Dynamic color based on category */
-    }
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 2px;
-    }
-    .stTabs [data-baseweb="tab"] {
-        height: 50px;
-        white-space: pre-wrap;
-        background-color: #f3f4f6; /* Light gray for inactive tabs */
-        border-radius: 4px 4px 0px 0px;
-        gap: 1px;
-        padding-top: 10px;
-        padding-bottom: 10px;
-    }
-    .stTabs [aria-selected="true"] {
-        background-color: #3b82f6; /* Blue for active tab */
-        color: white;
-    }
-    /* Table styling (from previous examples) */
-    .dataframe { /* Target Streamlit's default table rendering for consistency */
-        border-collapse: collapse;
-        margin: 25px 0;
-        font-size: 0.9em;
-        font-family: sans-serif;
-        min-width: 400px;
-        box-shadow: 0 0 20px rgba(0, 0, 0, 0.15);
-        border-radius: 10px; /* Rounded corners for table */
-        overflow: hidden; /* Ensures border radius is respected */
-    }
-    .dataframe thead tr {
-        background-color: #3b82f6; /* Header background */
-        color: #ffffff; /* Header text color */
-        text-align: left;
-    }
-    .dataframe th,
-    .dataframe td {
-        padding: 12px 15px;
-    }
-    .dataframe tbody tr {
-        border-bottom: 1px solid #dddddd;
-    }
-    .dataframe tbody tr:nth-of-type(even) {
-        background-color: #f3f3f3; /* Zebra striping for rows */
-    }
-    .dataframe tbody tr:last-of-type {
-        border-bottom: 2px solid #3b82f6; /* Emphasize table end */
-    }
-    /* Custom sidebar styling */
-    .css-1d391kg { /* This class might change with Streamlit updates, target more generically if needed */
-        background-color: #f1f5f9; /* Lighter sidebar background */
-    }
-    /* Responsive adjustments */
-    @media (max-width: 768px) {
-        .main h1 { font-size: 2rem; }
-        .element-card { padding: 1rem; }
-    }
-</style>
-""", unsafe_allow_html=True)
-
-# App state management
-class AppState:
-    def __init__(self):
-        self.category_colors = {
-            "diatomic nonmetal": "#7dd3fc", # Light blue for diatomic nonmetals
-            "noble gas": "#a78bfa", # Purple for noble gases
-            "alkali metal": "#fb923c", # Orange for alkali metals
-            "alkaline earth metal": "#facc15", # Yellow for alkaline earth metals
-            "metalloid": "#4ade80", # Green for metalloids
-            "polyatomic nonmetal": "#22d3ee", # Cyan for polyatomic nonmetals
-            "post-transition metal": "#a3a3a3", # Gray for post-transition metals
-            "transition metal": "#f472b6", # Pink for transition metals
-            "lanthanide": "#d8b4fe", # Lighter purple for lanthanides
-            "actinide": "#fda4af", # Lighter red/pink for actinides
-            "unknown, probably transition metal": "#e5e5e5",
-            "unknown, probably metalloid": "#e5e5e5",
-            "unknown, probably post-transition metal": "#e5e5e5",
-            "unknown, predicted to be noble gas": "#e5e5e5",
-            "unknown, but predicted to be an alkali metal": "#e5e5e5",
-            "nonmetal": "#67e8f9", # Default nonmetal color if more specific not available
-            "unknown": "#e0e0e0" # Default for unknown
-        }
+# Custom CSS for production-grade UI, served once from static/app.css (see .streamlit/config.toml)
+# so each rerun only re-sends this link tag instead of the whole stylesheet
+st.markdown('<link rel="stylesheet" href="app/static/app.css">', unsafe_allow_html=True)
+
+# Category colors: module-level and read-only, shared by every session and rerun
+_CATEGORY_COLORS = types.MappingProxyType({
+    "diatomic nonmetal": "#7dd3fc", # Light blue for diatomic nonmetals
+    "noble gas": "#a78bfa", # Purple for noble gases
+    "alkali metal": "#fb923c", # Orange for alkali metals
+    "alkaline earth metal": "#facc15", # Yellow for alkaline earth metals
+    "metalloid": "#4ade80", # Green for metalloids
+    "polyatomic nonmetal": "#22d3ee", # Cyan for polyatomic nonmetals
+    "post-transition metal": "#a3a3a3", # Gray for post-transition metals
+    "transition metal": "#f472b6", # Pink for transition metals
+    "lanthanide": "#d8b4fe", # Lighter purple for lanthanides
+    "actinide": "#fda4af", # Lighter red/pink for actinides
+    "unknown, probably transition metal": "#e5e5e5",
+    "unknown, probably metalloid": "#e5e5e5",
+    "unknown, probably post-transition metal": "#e5e5e5",
+    "unknown, predicted to be noble gas": "#e5e5e5",
+    "unknown, but predicted to be an alkali metal": "#e5e5e5",
+    "nonmetal": "#67e8f9", # Default nonmetal color if more specific not available
+    "unknown": "#e0e0e0" # Default for unknown
+})
+# Keys normalized the same way as incoming categories, for vectorized lookups
+_NORMALIZED_COLORS = types.MappingProxyType({k.lower().replace('-', ' '): v for k, v in _CATEGORY_COLORS.items()})
+
+
+@functools.lru_cache(maxsize=32) # Only a dozen or so distinct categories exist
+def get_element_color(category):
+    # Normalize category string for matching
+    normalized_category = category.lower().replace('-', ' ') if isinstance(category, str) else "unknown"
+    
+    # Direct match
+    if normalized_category in _NORMALIZED_COLORS:
+        return _NORMALIZED_COLORS[normalized_category]
+    
+    # Partial match for keys like "unknown, probably transition metal"
+    for key, color in _CATEGORY_COLORS.items():
+        if normalized_category.startswith(key.split(',')[0]): # e.g. "unknown"
+            return color # this logic might need refinement based on desired fallback
+    
+    # General fallback
+    if "nonmetal" in normalized_category: return _CATEGORY_COLORS["nonmetal"]
+    if "metal" in normalized_category: return _CATEGORY_COLORS["transition metal"] # A general metal color
+    
+    return _CATEGORY_COLORS["unknown"]
+
+
+def colors_for_series(cat_series):
+    # Vectorized get_element_color: one hash lookup per row via Series.map
+    normalized = cat_series.fillna('unknown').astype(str).str.lower().str.replace('-', ' ', regex=False)
+    colors = normalized.map(_NORMALIZED_COLORS)
+    missing = colors.isna()
+    if missing.any():
+        # Only the few categories needing the fallback rules are resolved in Python, once each
+        fallback = {cat: get_element_color(cat) for cat in normalized[missing].unique()}
+        colors = colors.fillna(normalized.map(fallback))
+    return colors
+
+
+@st.cache_resource
+def _get_http():
+    # Shared HTTP session: keeps connections alive across fetches and users instead of a new TLS handshake each time
+    return requests.Session()
 
-    def get_element_color(self, category):
-        # Normalize category string for matching
-        normalized_category = category.lower().replace('-', ' ') if isinstance(category, str) else "unknown"
-        
-        # Direct match
-        if normalized_category in self.category_colors:
-            return self.category_colors[normalized_category]
-        
-        # Partial match for keys like "unknown, probably transition metal"
-        for key, color in self.category_colors.items():
-            if normalized_category.startswith(key.split(',')[0]): # e.g. "unknown"
-                return color # this logic might need refinement based on desired fallback
-        
-        # General fallback
-        if "nonmetal" in normalized_category: return self.category_colors["nonmetal"]
-        if "metal" in normalized_category: return self.category_colors["transition metal"] # A general metal color
-        
-        return self.category_colors["unknown"]
 
+_http = _get_http()
 
-state = AppState()
 
-@st.cache_data(ttl=3600)
+@st.cache_data(ttl=86400, show_spinner=False)
+def _fetch_image(url):
+    # Raw bytes for st.image, so element images are downloaded once rather than on every rerun.
+    # A definitive client error (no such image) is cached as None for the full TTL; transient
+    # failures (timeouts, 5xx, 408/429) raise, so they are never cached here for a day
+    r = _http.get(url, timeout=5)
+    if 400 <= r.status_code < 500 and r.status_code not in (408, 429):
+        return None
+    r.raise_for_status()
+    return r.content
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _fetch_image_or_none(url):
+    # Remembers transient failures for a few minutes only: a slow or unreachable host costs one
+    # timeout per 5 minutes rather than one per rerun, and a blip doesn't hide the photo for a day
+    try:
+        return _fetch_image(url)
+    except requests.exceptions.RequestException:
+        return None
+
+
+ELEMENT_DATA_URL = "https://raw.githubusercontent.com/Bowserinator/Periodic-Table-JSON/master/PeriodicTableJSON.json"
+ELEMENT_DATA_TTL = 3600 # Seconds, for the in-process st.cache_data entry
+ELEMENT_DISK_CACHE_TTL = 90 * 24 * 3600 # Seconds; the dataset changes rarely, so the on-disk copy lives much longer
+
+# Bump whenever load_element_data adds or changes derived columns, so stale disk caches are ignored
+ELEMENT_CACHE_SCHEMA = 9
+
+# On-disk copy of the normalized dataset, next to the app so it survives container/worker restarts;
+# the URL hash versions the file if the source changes
+ELEMENT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+ELEMENT_CACHE_PATH = os.path.join(
+    ELEMENT_CACHE_DIR,
+    f"elements_v{ELEMENT_CACHE_SCHEMA}_{hashlib.sha1(ELEMENT_DATA_URL.encode()).hexdigest()[:12]}.parquet"
+)
+# HTTP validators (ETag / Last-Modified) of the response the parquet file was built from
+ELEMENT_CACHE_META_PATH = os.path.splitext(ELEMENT_CACHE_PATH)[0] + ".meta.json"
+
+
+def _read_element_cache(path, ttl):
+    # Returns the cached frame if the file exists and is younger than ttl (any age if ttl is None), else None
+    try:
+        if ttl is not None and time.time() - os.path.getmtime(path) > ttl:
+            return None
+        elements_df = pd.read_parquet(path)
+    except (OSError, ValueError, ImportError):
+        return None
+    # Parquet hands list columns back as NumPy arrays; restore plain lists so values render the same
+    # as after a fresh fetch (e.g. "[520.2, 7298.1]" rather than "[520.2 7298.1]")
+    for col in elements_df.columns[elements_df.dtypes == object]:
+        if elements_df[col].map(lambda v: isinstance(v, np.ndarray)).any():
+            elements_df[col] = elements_df[col].map(lambda v: v.tolist() if isinstance(v, np.ndarray) else v)
+    return elements_df
+
+
+def _write_element_cache(elements_df, path):
+    # Best effort: a failed write only means the next cold start refetches
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        elements_df.reset_index(drop=True).to_parquet(path, compression='zstd')
+    except (OSError, ValueError, TypeError, ImportError):
+        pass
+
+
+def _read_cache_validators(meta_path):
+    # Conditional-request headers for revalidating the stale parquet copy; empty if there is nothing to revalidate
+    try:
+        with open(meta_path, 'rb') as f:
+            meta = json.loads(f.read())
+    except (OSError, ValueError):
+        return {}
+    headers = {}
+    if meta.get('etag'):
+        headers['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'):
+        headers['If-Modified-Since'] = meta['last_modified']
+    return headers
+
+
+def _write_cache_validators(response, meta_path):
+    # Best effort, like the parquet write: without validators the next expiry simply does a full download
+    meta = {'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified')}
+    try:
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f)
+    except OSError:
+        pass
+
+
+def _add_derived_columns(elements_df):
+    # Per-element values derived once with the cached frame instead of on every rerun
+    # Category color, resolved once instead of per render
+    elements_df['_color'] = colors_for_series(elements_df['category'])
+    # Display string for the atomic mass, formatted once rather than on every card/hover render
+    masses = pd.to_numeric(elements_df['atomic_mass'], errors='coerce')
+    elements_df['_mass_str'] = masses.map(lambda v: f"{v:.4f}" if pd.notna(v) else "")
+    # Lowercased copies for the sidebar search
+    elements_df['_name_lc'] = elements_df['name'].str.lower()
+    elements_df['_symbol_lc'] = elements_df['symbol'].str.lower()
+    # Electron count per shell, parsed from the configuration string
+    elements_df['_shells'] = elements_df['electron_configuration'].map(_parse_shells_fast)
+    # Display form with superscripted electron counts
+    config = elements_df.get('electron_configuration_semantic', elements_df['electron_configuration'])
+    elements_df['_config_html'] = (
+        config.fillna(elements_df['electron_configuration']).fillna('').astype(str)
+        .map(html.escape) # Rendered as HTML, so escape the upstream text before adding markup
+        .str.replace(_CFG_RE, _CFG_SUB, regex=True)
+        .str.replace(' ', '&nbsp;', regex=False)
+    )
+    # The filtered columns as categoricals (last, after the string-based columns above): sidebar masks
+    # become a lookup of each row's integer code instead of hashing object-dtype strings
+    for col in ('category', 'phase'):
+        elements_df[col] = elements_df[col].astype('category')
+    # Content hash of each full record (stringified, since some columns hold lists), so caches of
+    # whole records can be keyed on a cheap column sum instead of rehashing every column per rerun
+    elements_df['_row_hash'] = pd.util.hash_pandas_object(elements_df.astype(str), index=False).to_numpy()
+
+
+@st.cache_data(ttl=ELEMENT_DATA_TTL, show_spinner="Loading element data...")
 def load_element_data():
+    # Second tier: a fresh parquet file skips the network fetch and JSON parsing entirely
+    cached_df = _read_element_cache(ELEMENT_CACHE_PATH, ELEMENT_DISK_CACHE_TTL)
+    if cached_df is not None:
+        return cached_df
     try:
-        url = "https://raw.githubusercontent.com/Bowserinator/Periodic-Table-JSON/master/PeriodicTableJSON.json"
-        response = requests.get(url)
+        url = ELEMENT_DATA_URL
+        # The disk copy has expired: revalidate it instead of downloading the whole body again
+        headers = _read_cache_validators(ELEMENT_CACHE_META_PATH) if os.path.exists(ELEMENT_CACHE_PATH) else {}
+        response = _http.get(url, headers=headers, timeout=10)
+        if response.status_code == 304:
+            stale_df = _read_element_cache(ELEMENT_CACHE_PATH, None)
+            if stale_df is not None:
+                # Unchanged upstream: restart the disk TTL and reuse the parquet file
+                try:
+                    os.utime(ELEMENT_CACHE_PATH, None)
+                except OSError:
+                    pass
+                return stale_df
+            response = _http.get(url, timeout=10)
         response.raise_for_status() # Will raise an HTTPError if the HTTP request returned an unsuccessful status code
-        data = response.json()
-        elements_df = pd.json_normalize(data['elements'])
+        data = orjson.loads(response.content) if orjson is not None else response.json()
         
         # Ensure essential columns exist, providing defaults if necessary
         required_cols = {
@@ -165,6 +255,15 @@ def load_element_data():
             'period': 0, 'group': 0, 'xpos': 0, 'ypos': 0, 'atomic_mass': 0.0,
             'electron_configuration': '', 'phase': 'Unknown'
         }
+
+        # The columns we rely on are flat, so a plain DataFrame suffices; json_normalize's recursive
+        # flattening is only needed if one of them ever arrives as a nested object
+        records = data['elements']
+        if records and any(isinstance(records[0].get(col), dict) for col in required_cols):
+            elements_df = pd.json_normalize(records)
+        else:
+            elements_df = pd.DataFrame(records)
+
         for col, default_val in required_cols.items():
             if col not in elements_df.columns:
                 elements_df[col] = default_val
@@ -180,6 +279,9 @@ def load_element_data():
         for col in ['name', 'symbol', 'category', 'electron_configuration', 'phase']:
              elements_df[col] = elements_df[col].fillna(required_cols.get(col, 'Unknown'))
 
+        _add_derived_columns(elements_df)
+        _write_element_cache(elements_df, ELEMENT_CACHE_PATH)
+        _write_cache_validators(response, ELEMENT_CACHE_META_PATH)
         return elements_df
     except requests.exceptions.RequestException as e:
         st.error(f"Network error loading element data: {e}")
@@ -189,19 +291,19 @@ def load_element_data():
         st.error(f"Unexpected JSON structure for element data (missing 'elements' key?): {e}")
     # Fallback to a minimal dataset if loading fails
     st.warning("Using a minimal fallback dataset for elements.")
-    return pd.DataFrame([
+    fallback_df = pd.DataFrame([
         {"name": "Hydrogen", "symbol": "H", "number": 1, "category": "diatomic nonmetal", "period": 1, "group": 1, "xpos": 1, "ypos": 1, "atomic_mass": 1.008, "electron_configuration": "1s1", "phase": "Gas"},
         {"name": "Helium", "symbol": "He", "number": 2, "category": "noble gas", "period": 1, "group": 18, "xpos": 18, "ypos": 1, "atomic_mass": 4.0026, "electron_configuration": "1s2", "phase": "Gas"},
         {"name": "Lithium", "symbol": "Li", "number": 3, "category": "alkali metal", "period": 2, "group": 1, "xpos": 1, "ypos": 2, "atomic_mass": 6.94, "electron_configuration": "[He] 2s1", "phase": "Solid"},
         {"name": "Carbon", "symbol": "C", "number": 6, "category": "polyatomic nonmetal", "period": 2, "group": 14, "xpos": 14, "ypos": 2, "atomic_mass": 12.011, "electron_configuration": "[He] 2s2 2p2", "phase": "Solid"},
         {"name": "Oxygen", "symbol": "O", "number": 8, "category": "diatomic nonmetal", "period": 2, "group": 16, "xpos": 16, "ypos": 2, "atomic_mass": 15.999, "electron_configuration": "[He] 2s2 2p4", "phase": "Gas"},
     ])
+    _add_derived_columns(fallback_df)
+    return fallback_df
 
 
-def format_electron_configuration(config_str):
-    if not isinstance(config_str, str): return ""
-    # Simple formatter, can be expanded
-    return config_str.replace(" ", "&nbsp;").replace("s", "s<sup>").replace("p", "p<sup>").replace("d", "d<sup>").replace("f", "f<sup>") + ("</sup>" * config_str.count("["))
+_CFG_RE = re.compile(r'(\d[spdf])(\d+)') # Subshell (e.g. "3d") followed by its electron count
+_CFG_SUB = r'\1<sup>\2</sup>'
 
 
 def create_element_card(element, color):
@@ -212,7 +314,7 @@ def create_element_card(element, color):
             <h2 style="margin: 0; font-size: 2.5rem;">{element.get('symbol', 'N/A')}</h2>
             <div style="text-align: right;">
                 <span style="font-size: 2rem; font-weight: 600;">{element.get('number', 'N/A')}</span>
-                <div style="font-size: 0.9rem; color: #6b7280;">{element.get('atomic_mass', 0.0):.4f} u</div>
+                <div style="font-size: 0.9rem; color: #6b7280;">{element.get('_mass_str', '')} u</div>
             </div>
         </div>
         <h3 style="margin-top: 0.5rem; margin-bottom: 1rem; font-size: 1.8rem;">{element.get('name', 'N/A')}</h3>
@@ -234,49 +336,54 @@ def create_element_card(element, color):
     """, unsafe_allow_html=True)
 
 # Plotly functions (Electron Shell, Molecular Structure - kept from previous)
-def create_electron_shell_visualization(electron_config_str):
-    # (Your existing robust function)
-    fig = go.Figure()
-    # Placeholder logic, replace with your actual shell visualization
-    shells_data = {}
+_SHELL_RE = re.compile(r'(\d)[spdf](\d+)') # e.g. "3d10" -> shell 3, 10 electrons; noble-gas cores are skipped
+
+# Unit circle shared by every orbit drawing
+_THETA100 = np.linspace(0, 2 * np.pi, 100)
+_COS100, _SIN100 = np.cos(_THETA100), np.sin(_THETA100)
+
+
+def _parse_shells_fast(electron_config_str):
+    # Electron count per shell as a plain list (index 0 is shell 1); run once per element at load time
+    shells_data = collections.Counter()
     if isinstance(electron_config_str, str):
-        # Example parsing: "1s2 2s2 2p6"
         # This is highly simplified; a real parser is complex.
-        parts = electron_config_str.replace('[', '').replace(']', ' ').split()
-        current_shell = 0
-        for part in parts:
-            if part.endswith('s') or part.endswith('p') or part.endswith('d') or part.endswith('f'):
-                 # Handles core like "He" or "Ne" by skipping them for this simple viz
-                continue
-            try:
-                shell_num = int(part[0])
-                electrons = int(part[2:])
-                shells_data[shell_num] = shells_data.get(shell_num, 0) + electrons
-            except (ValueError, IndexError):
-                pass # Ignore malformed parts for this simple viz
+        for shell_num, electrons in _SHELL_RE.findall(electron_config_str):
+            shells_data[int(shell_num)] += int(electrons)
+    return [shells_data.get(n, 0) for n in range(1, max(shells_data, default=0) + 1)]
+
+
+@st.cache_data(show_spinner=False)
+def _electron_shell_figure_dict(shell_counts):
+    # Cached per shell-count tuple; returns a dict so callers get their own Figure
+    import plotly.graph_objects as go # Deferred: only the Visualizations tab needs graph objects
+    fig = go.Figure()
     
-    if not shells_data: # Fallback if parsing fails or empty
+    if not any(shell_counts): # Fallback if parsing fails or empty
         fig.add_annotation(text="Electron shell data not available or unparsable.", showarrow=False)
-        return fig
+        return fig.to_dict()
 
-    max_shell = max(shells_data.keys()) if shells_data else 0
+    counts = np.asarray(shell_counts)
+    max_shell = len(counts)
+    radii = 1.5 * np.arange(1, max_shell + 1)
     
     # Nucleus
     fig.add_shape(type="circle", xref="x", yref="y", x0=-0.5, y0=-0.5, x1=0.5, y1=0.5, fillcolor="tomato")
     
-    for shell_num in range(1, max_shell + 1):
-        radius = shell_num * 1.5
-        fig.add_shape(type="circle", xref="x", yref="y",
-                      x0=-radius, y0=-radius, x1=radius, y1=radius,
-                      line_color="lightblue", line_width=1, fillcolor="rgba(0,0,0,0)")
-        
-        electrons = shells_data.get(shell_num, 0)
-        if electrons > 0:
-            for i in range(electrons):
-                angle = (i / electrons) * 2 * np.pi
-                ex = radius * np.cos(angle)
-                ey = radius * np.sin(angle)
-                fig.add_trace(go.Scatter(x=[ex], y=[ey], mode='markers', marker=dict(color='blue', size=8)))
+    # All orbits in one broadcast: a NaN column after each circle breaks the line between shells
+    gap = np.full((max_shell, 1), np.nan)
+    orbit_x = np.hstack([radii[:, None] * _COS100, gap]).ravel()
+    orbit_y = np.hstack([radii[:, None] * _SIN100, gap]).ravel()
+    fig.add_trace(go.Scatter(x=orbit_x, y=orbit_y, mode='lines', line=dict(color='lightblue', width=1), hoverinfo='skip'))
+
+    # Electrons evenly spaced on their shell, computed for all shells at once
+    per_electron_count = np.repeat(counts, counts)
+    position_in_shell = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    angles = 2 * np.pi * position_in_shell / per_electron_count
+    electron_radii = np.repeat(radii, counts)
+
+    # All electrons in one trace instead of one trace per electron
+    fig.add_trace(go.Scattergl(x=electron_radii * np.cos(angles), y=electron_radii * np.sin(angles), mode='markers', marker=dict(color='blue', size=8)))
 
     fig.update_layout(
         title_text="Electron Shells (Simplified)",
@@ -286,17 +393,27 @@ def create_electron_shell_visualization(electron_config_str):
         width=300, height=300,
         margin=dict(t=50, b=0, l=0, r=0)
     )
-    return fig
+    return fig.to_dict()
 
 
-def generate_molecular_visualization(formula_str):
+def create_electron_shell_visualization(shell_counts):
+    # Takes the pre-parsed '_shells' column value (see _parse_shells_fast)
+    import plotly.graph_objects as go
+    return go.Figure(_electron_shell_figure_dict(tuple(int(e) for e in shell_counts)))
+
+
+@st.cache_data(show_spinner=False)
+def _molecular_figure_dict(formula_str):
+    # Cached per formula, so the random placement is also stable across reruns
     # (Your existing placeholder/example function)
+    import plotly.graph_objects as go
     fig = go.Figure()
     # Simplified: just places spheres for first few letters of formula
     num_atoms = min(len(formula_str), 5)
-    x_coords = np.random.rand(num_atoms) * 5
-    y_coords = np.random.rand(num_atoms) * 5
-    z_coords = np.random.rand(num_atoms) * 5
+    # Local generator seeded from the formula: no shared global RNG state across sessions, and the
+    # same formula always gets the same layout (crc32 is stable across processes, unlike hash())
+    rng = np.random.default_rng(zlib.crc32(formula_str.encode()))
+    x_coords, y_coords, z_coords = rng.uniform(0.0, 5.0, size=(3, num_atoms))
     colors = ['red', 'blue', 'green', 'yellow', 'purple']
     
     fig.add_trace(go.Scatter3d(
@@ -310,54 +427,76 @@ def generate_molecular_visualization(formula_str):
         width=400, height=400,
         margin=dict(t=50, b=0, l=0, r=0)
     )
-    return fig
+    return fig.to_dict()
+
+
+def generate_molecular_visualization(formula_str):
+    import plotly.graph_objects as go
+    return go.Figure(_molecular_figure_dict(formula_str))
 
 # --- Interactive Plotly Periodic Table via Custom Component ---
-def create_plotly_periodic_table_figure(elements_df, filtered_elements_df, selected_element_number=None):
-    fig = go.Figure()
-    
+def _build_base_traces(elements_df):
+    # The grid as plain dicts; only called from _periodic_table_figure_json, which already caches the
+    # result per dataset, and per-rerun state is applied as an overlay.
+    # All elements go into ONE WebGL trace with array-valued properties.
+    max_y = elements_df['ypos'].max() if not elements_df.empty else 10
+    symbols = elements_df['symbol'].astype(str)
+    categories = elements_df['category'].astype(str).str.title()
+    hovertexts = (
+        "<b>" + elements_df['name'].astype(str) + " (" + symbols + ")</b><br>"
+        "Number: " + elements_df['number'].astype(str) + "<br>"
+        "Mass: " + elements_df['_mass_str'] + "<br>"
+        "Category: " + categories
+    )
+    trace = dict(
+        type='scattergl',
+        x=elements_df['xpos'].to_numpy(),
+        y=(max_y - elements_df['ypos'] + 1).to_numpy(), # Invert y-axis for typical table layout
+        mode='markers+text',
+        marker=dict(
+            size=35, # Adjust size as needed
+            color=elements_df['_color'].to_numpy(),
+            opacity=1.0,
+            line=dict(color='black', width=0),
+            symbol='square'
+        ),
+        text=("<b>" + symbols + "</b>").to_numpy(),
+        textfont=dict(size=10, color='black'),
+        textposition="middle center",
+        hoverinfo='text',
+        hovertext=hovertexts.to_numpy(),
+        customdata=elements_df['number'].to_numpy() # Store element number for click events
+    )
+    return [trace]
+
+
+def _table_overlay(nums, filtered_numbers, selected_element_number=None):
+    # Per-point filter/selection styling for the table trace, as plain arrays;
+    # filtered_numbers=None means nothing is filtered out
+    is_selected = nums == selected_element_number if selected_element_number else np.zeros(len(nums), dtype=bool)
+    if filtered_numbers is None:
+        opacity = np.ones(len(nums))
+    else:
+        opacity = np.where(np.isin(nums, filtered_numbers) | is_selected, 1.0, 0.3) # Ensure selected is fully visible
+    return dict(
+        opacity=opacity,
+        line_colors=np.where(is_selected, '#FFD700', 'black'), # Gold outline for selected
+        line_widths=np.where(is_selected, 4, 0),
+        text_colors=np.where(opacity > 0.5, 'black', '#777') # Darker text for visible items
+    )
+
+
+def create_plotly_periodic_table_figure(elements_df):
+    # Unfiltered, unselected table; filter/selection state is applied client-side from _periodic_table_overlay_json
     # Determine max x and y for layout
     max_x = elements_df['xpos'].max() if not elements_df.empty else 18
     max_y = elements_df['ypos'].max() if not elements_df.empty else 10
 
-    for index, element in elements_df.iterrows():
-        is_filtered_out = element['number'] not in filtered_elements_df['number'].values
-        
-        opacity = 0.3 if is_filtered_out else 1.0
-        marker_line_color = 'black'
-        marker_line_width = 0
-        if selected_element_number and element['number'] == selected_element_number:
-            marker_line_color = '#FFD700' # Gold outline for selected
-            marker_line_width = 4
-            opacity = 1.0 # Ensure selected is fully visible
-
-        element_color = state.get_element_color(element.get('category', 'unknown'))
-
-        fig.add_trace(go.Scatter(
-            x=[element['xpos']],
-            y=[max_y - element['ypos'] +1], # Invert y-axis for typical table layout
-            mode='markers+text',
-            marker=dict(
-                size=35, # Adjust size as needed
-                color=element_color,
-                opacity=opacity,
-                line=dict(color=marker_line_color, width=marker_line_width),
-                symbol='square'
-            ),
-            text=f"<b>{element['symbol']}</b>",
-            textfont=dict(size=10, color='black' if opacity > 0.5 else '#777'), # Darker text for visible items
-            textposition="middle center",
-            hoverinfo='text',
-            hovertext=(
-                f"<b>{element['name']} ({element['symbol']})</b><br>"
-                f"Number: {element['number']}<br>"
-                f"Mass: {element.get('atomic_mass', 0.0):.3f}<br>"
-                f"Category: {str(element.get('category', 'N/A')).title()}"
-            ),
-            customdata=[element['number']] # Store element number for click events
-        ))
-
-    fig.update_layout(
+    traces = _build_base_traces(elements_df)
+    # A plain figure spec rather than go.Figure: the component serializes it straight to JSON,
+    # so building and validating graph objects would be pure overhead (and keeps plotly off the
+    # table's import path)
+    layout = dict(
         xaxis=dict(range=[0, max_x + 1], showgrid=False, zeroline=False, showticklabels=False, fixedrange=True),
         yaxis=dict(range=[0, max_y + 1], showgrid=False, zeroline=False, showticklabels=False, fixedrange=True),
         margin=dict(t=20, b=20, l=20, r=20),
@@ -367,131 +506,240 @@ def create_plotly_periodic_table_figure(elements_df, filtered_elements_df, selec
         height= (max_y + 1) * 45, # Dynamic height based on number of periods
         clickmode='event' # Important for capturing click events
     )
-    return fig
-
-
-# HTML for the custom Plotly component
-PLOTLY_COMPONENT_HTML = """
-<div id="plotlyChartContainer" style="width:100%; height:100%;"></div>
-<script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
-<script>
-const chartDiv = document.getElementById('plotlyChartContainer');
-const figData = {fig_data_placeholder}; // Will be replaced by Python
-const figLayout = {fig_layout_placeholder}; // Will be replaced by Python
-
-Plotly.newPlot(chartDiv, figData, figLayout, {{responsive: true}}).then(gd => {{
-    gd.on('plotly_click', eventData => {{
-        if (eventData.points.length > 0) {{
-            const clickedPoint = eventData.points[0];
-            if (clickedPoint.customdata !== undefined) {{
-                Streamlit.setComponentValue({{
-                    type: "element_click",
-                    number: clickedPoint.customdata[0] // customdata is an array
-                }});
-            }}
-        }}
-    }});
-}});
-
-// Adjust height of iframe to content
-function sendHeight() {{
-    Streamlit.setFrameHeight(document.getElementById('plotlyChartContainer').offsetHeight + 20);
-}}
-// Ensure Plotly has rendered before sending height
-const observer = new MutationObserver(function(mutationsList, observer) {{
-    for(let mutation of mutationsList) {{
-        if (mutation.type === 'childList' || mutation.type === 'attributes') {{
-            sendHeight();
-            // observer.disconnect(); // Disconnect after first render if static, or keep for dynamic
-            break;
-        }}
-    }}
-}});
-observer.observe(chartDiv, {{ attributes: true, childList: true, subtree: true }});
-window.addEventListener('resize', sendHeight);
-// Initial height setting after a short delay for rendering
-setTimeout(sendHeight, 200); 
-</script>
-"""
-
-def display_element_details(element_series, elements_df_full):
-    if element_series is None or element_series.empty:
+    return dict(data=traces, layout=layout)
+
+
+def _json_default(o):
+    # Fallback for types the JSON encoders can't serialize natively (numpy arrays/scalars, Plotly objects)
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    if isinstance(o, np.generic):
+        return o.item()
+    if hasattr(o, 'to_plotly_json'):
+        return o.to_plotly_json()
+    raise TypeError(f"Type is not JSON serializable: {type(o).__name__}")
+
+
+def _dumps_plotly(obj):
+    if orjson is not None:
+        return orjson.dumps(obj, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(obj, default=_json_default)
+
+
+def _records_fingerprint(elements_df):
+    # Cache key for everything derived from the dataset. Passing the full frame to st.cache_data instead
+    # would make Streamlit pickle it on every rerun, since list-valued columns defeat its pandas hashing;
+    # summing the precomputed _row_hash column costs microseconds rather than rehashing columns per rerun
+    return int(elements_df['_row_hash'].sum())
+
+
+@st.cache_resource(ttl=ELEMENT_DATA_TTL, max_entries=4, show_spinner=False)
+def _elements_by_number(records_key, _elements_df):
+    # One plain dict per element, built once per dataset and shared read-only across sessions
+    # (cache_resource hands back the same object, so lookups don't unpickle all 118 records per rerun)
+    records = _elements_df.to_dict('records')
+    return types.MappingProxyType({rec['number']: rec for rec in records})
+
+
+@st.cache_resource(ttl=ELEMENT_DATA_TTL, max_entries=4, show_spinner=False)
+def _element_name_lookups(records_key, _elements_df):
+    # Selectbox options and name -> number map, built once per dataset (name and number are
+    # covered by records_key) and shared read-only, so a reload or the fallback data never leaves them stale
+    sorted_names = tuple(_elements_df['name'].sort_values().tolist())
+    names_map = types.MappingProxyType(dict(zip(_elements_df['name'].tolist(), _elements_df['number'].tolist())))
+    return sorted_names, names_map
+
+
+def _categorical_mask(cat_series, values):
+    # isin() via the categorical codes: membership is decided once per category, then gathered per row.
+    # The trailing False is what code -1 (missing value) indexes.
+    lut = np.append(np.isin(cat_series.cat.categories.to_numpy(), list(values)), False)
+    return lut[cat_series.cat.codes.to_numpy()]
+
+
+@st.cache_data(ttl=ELEMENT_DATA_TTL, max_entries=64, show_spinner=False)
+def _filter_elements(records_key, _elements_df, categories, phases, search_query):
+    # Keyed on the dataset fingerprint plus the filter selection, so reruns triggered by unrelated
+    # widgets (table clicks, detail tabs) skip the masks and string scans. categories/phases are
+    # None when they don't narrow anything. Returns the matching element numbers and the
+    # categories in view (in table order) rather than a frame, which cache hits would have to unpickle.
+    elements_df = _elements_df
+    # Fuse all filters into one boolean mask so the frame is sliced only once
+    mask = np.ones(len(elements_df), dtype=bool)
+    if categories is not None:
+        mask &= _categorical_mask(elements_df['category'], categories)
+    if phases is not None:
+        mask &= _categorical_mask(elements_df['phase'], phases)
+    if search_query:
+        mask &= (
+            elements_df['_name_lc'].str.contains(search_query, regex=False, na=False) |
+            elements_df['_symbol_lc'].str.contains(search_query, regex=False, na=False)
+        ).to_numpy()
+    matched = elements_df.loc[mask, ['number', 'category']]
+    return tuple(matched['number'].tolist()), tuple(matched['category'].unique().tolist())
+
+
+@st.cache_data(ttl=ELEMENT_DATA_TTL, max_entries=32, show_spinner=False)
+def _periodic_table_figure_json(records_key, _elements_df):
+    # The full figure depends only on the dataset, so it is built and serialized once; the component
+    # only redraws when records_key changes, and filter/selection changes go out as an overlay
+    elements_df = _elements_df
+    plotly_fig = create_plotly_periodic_table_figure(elements_df)
+    # Plain arrays in the JSON: Figure.to_dict() would base64-pack numeric arrays,
+    # which the CDN Plotly.js build used by the component cannot decode
+    fig_height = int(plotly_fig['layout'].get('height') or 600) # Component args must be plain JSON types
+    return _dumps_plotly(plotly_fig['data']), _dumps_plotly(plotly_fig['layout']), fig_height
+
+
+def _periodic_table_overlay_json(elements_df, filtered_numbers, selected_element_number):
+    # Tiny per-rerun payload: the overlay arrays for the already-drawn table
+    overlay = _table_overlay(
+        elements_df['number'].to_numpy(),
+        None if filtered_numbers is None else np.asarray(filtered_numbers),
+        selected_element_number
+    )
+    return _dumps_plotly(overlay)
+
+
+# Bidirectional Plotly table (frontend in components/periodic_table): unlike components.html it
+# reports clicks back, and reruns update the mounted iframe's args instead of replacing its document
+_periodic_table_component = st.components.v1.declare_component(
+    "periodic_table",
+    path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "components", "periodic_table")
+)
+
+
+def _phys_props(element):
+    return (
+        ("Melting Point", f"{element.get('melt', 'N/A')} K"),
+        ("Boiling Point", f"{element.get('boil', 'N/A')} K"),
+        ("Density", f"{element.get('density', 'N/A')} g/cm³"),
+        ("Phase at STP", str(element.get('phase', 'Unknown')).title()),
+        ("Electronegativity (Pauling)", element.get('electronegativity_pauling', 'N/A')),
+        ("Atomic Radius", f"{element.get('atomic_radius', 'N/A')} pm"),
+    )
+
+
+def _chem_props(element):
+    return (
+        ("Atomic Number", element.get('number', 'N/A')),
+        ("Atomic Mass", f"{element.get('_mass_str', '')} u"),
+        ("Oxidation States", element.get('common_oxidation_states', element.get('oxidation_states', 'N/A'))), # Prefer common if available
+        ("Electron Affinity", f"{element.get('electron_affinity', 'N/A')} kJ/mol"),
+        ("Ionization Energies (eV)", str(element.get('ionization_energies', ['N/A'])[:3]) + "..."), # Show first few
+    )
+
+
+# Property tables are cached per element number and record hash (_row_hash), so a reloaded dataset
+# gets fresh tables; the leading underscore keeps the record itself out of the cache key
+@st.cache_data(ttl=ELEMENT_DATA_TTL, show_spinner=False)
+def _physical_props_table(number, row_hash, _element):
+    return pd.DataFrame(_phys_props(_element), columns=["Property", "Value"])
+
+
+@st.cache_data(ttl=ELEMENT_DATA_TTL, show_spinner=False)
+def _chemical_props_table(number, row_hash, _element):
+    return pd.DataFrame(_chem_props(_element), columns=["Property", "Value"])
+
+
+def display_element_details(element, elements_df_full):
+    if not element:
         st.info("Select an element from the periodic table to view its details, or use the search/filter options.")
         return
 
-    # Ensure element_series is a Series (it should be if iloc[0] was used)
-    if not isinstance(element_series, pd.Series):
+    # Expect a plain dict (one row as a record): every field access below is then a C-level dict
+    # lookup rather than a pandas Series.__getitem__ with dtype dispatch
+    if not isinstance(element, dict):
         st.error("Invalid element data provided for details display.")
         return
 
-    category = element_series.get('category', 'unknown')
-    color = state.get_element_color(category)
-    create_element_card(element_series, color)
+    color = element.get('_color') or get_element_color(element.get('category', 'unknown'))
+    create_element_card(element, color)
 
+    # A radio instead of st.tabs: st.tabs runs every tab body on each rerun, this renders only the visible one
     tabs_titles = ["Overview", "Physical Properties", "Chemical Properties", "Visualizations", "Applications & Isotopes"]
-    tabs = st.tabs(tabs_titles)
+    active_tab = st.radio("Details section", tabs_titles, horizontal=True, key='active_detail_tab', label_visibility="collapsed")
 
-    with tabs[0]: # Overview
+    if active_tab == "Overview":
         col1, col2 = st.columns([3, 2])
         with col1:
-            st.markdown("### Summary")
-            st.markdown(element_series.get('summary', "No summary available."))
-            st.markdown("### Basic Information")
+            # One markdown element per block rather than one per line; only the prebuilt (escaped)
+            # electron configuration markup is rendered with unsafe_allow_html, never the raw upstream text
+            st.markdown(f"### Summary\n\n{element.get('summary', 'No summary available.')}")
             basic_info = {
-                "Discovered by": element_series.get('discovered_by', 'N/A'),
-                "Named by": element_series.get('named_by', 'N/A'),
-                "Electron Config.": element_series.get('electron_configuration_semantic', element_series.get('electron_configuration', 'N/A')),
+                "Discovered by": element.get('discovered_by', 'N/A'),
+                "Named by": element.get('named_by', 'N/A'),
             }
-            for key, value in basic_info.items(): st.markdown(f"**{key}:** {value}")
+            st.markdown("### Basic Information\n\n" + "\n\n".join(f"**{key}:** {value}" for key, value in basic_info.items()))
+            st.markdown(f"**Electron Config.:** {element.get('_config_html') or 'N/A'}", unsafe_allow_html=True)
         with col2:
-            img_name = str(element_series.get('name', '')).lower()
-            if img_name:
-                st.image(f"https://images-of-elements.com/s/{img_name}.jpg", caption=element_series.get('name'), use_container_width=True, width=150)
+            img_name = str(element.get('name', '')).lower()
+            img_bytes = _fetch_image_or_none(f"https://images-of-elements.com/s/{img_name}.jpg") if img_name else None
+            if img_bytes: # None (fetch failed) falls through to the placeholder
+                st.image(img_bytes, caption=element.get('name'), use_container_width=True, width=150)
             else:
-                st.image("https://via.placeholder.com/150?text=No+Image", caption="Image N/A", use_container_width=True)
-            st.markdown(f"**Category:** {str(element_series.get('category', 'N/A')).title()}")
+                st.image(_NO_IMAGE_SVG, caption="Image N/A", use_container_width=True)
+            st.markdown(f"**Category:** {str(element.get('category', 'N/A')).title()}")
 
-    with tabs[1]: # Physical Properties
+    elif active_tab == "Physical Properties":
         st.markdown("### Physical Properties")
-        physical_props = {
-            "Melting Point": f"{element_series.get('melt', 'N/A')} K",
-            "Boiling Point": f"{element_series.get('boil', 'N/A')} K",
-            "Density": f"{element_series.get('density', 'N/A')} g/cm³",
-            "Phase at STP": str(element_series.get('phase', 'Unknown')).title(),
-            "Electronegativity (Pauling)": element_series.get('electronegativity_pauling', 'N/A'),
-            "Atomic Radius": f"{element_series.get('atomic_radius', 'N/A')} pm",
-        }
-        st.table(pd.DataFrame(physical_props.items(), columns=["Property", "Value"]))
+        st.table(_physical_props_table(element.get('number'), element.get('_row_hash'), element))
 
-    with tabs[2]: # Chemical Properties
+    elif active_tab == "Chemical Properties":
         st.markdown("### Chemical Properties")
-        chem_props = {
-            "Atomic Number": element_series.get('number', 'N/A'),
-            "Atomic Mass": f"{element_series.get('atomic_mass', 0.0):.4f} u",
-            "Oxidation States": element_series.get('common_oxidation_states', element_series.get('oxidation_states', 'N/A')), # Prefer common if available
-            "Electron Affinity": f"{element_series.get('electron_affinity', 'N/A')} kJ/mol",
-            "Ionization Energies (eV)": str(element_series.get('ionization_energies', ['N/A'])[:3]) + "...", # Show first few
-        }
-        st.table(pd.DataFrame(chem_props.items(), columns=["Property", "Value"]))
+        st.table(_chemical_props_table(element.get('number'), element.get('_row_hash'), element))
 
-    with tabs[3]: # Visualizations
+    elif active_tab == "Visualizations":
         viz_col1, viz_col2 = st.columns(2)
         with viz_col1:
             st.markdown("#### Electron Shells")
-            fig_e = create_electron_shell_visualization(element_series.get('electron_configuration', ''))
+            fig_e = create_electron_shell_visualization(element.get('_shells', []))
             st.plotly_chart(fig_e, use_container_width=True)
         with viz_col2:
             st.markdown("#### Molecular (Example)")
-            fig_m = generate_molecular_visualization(element_series.get('symbol', 'X'))
+            fig_m = generate_molecular_visualization(element.get('symbol', 'X'))
             st.plotly_chart(fig_m, use_container_width=True)
 
-    with tabs[4]: # Applications & Isotopes
-        st.markdown("### Applications")
-        st.markdown(element_series.get('uses', "Specific applications not detailed."))
-        st.markdown("### Isotopes")
+    elif active_tab == "Applications & Isotopes":
         # The JSON structure for isotopes might be nested or complex.
         # This is a placeholder; actual parsing would depend on 'PeriodicTableJSON.json' structure for isotopes.
-        st.markdown("Isotope data might require specific parsing from the source JSON.")
+        st.markdown(
+            f"### Applications\n\n{element.get('uses', 'Specific applications not detailed.')}\n\n"
+            "### Isotopes\n\nIsotope data might require specific parsing from the source JSON."
+        )
+
+
+# Inline SVGs for the sidebar logo and the missing-image placeholder: st.image embeds markup
+# directly, so neither costs the browser a request to an external host on page load
+_LOGO_SVG = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="150" height="60" viewBox="0 0 150 60">'
+    '<rect x="2" y="2" width="56" height="56" rx="6" fill="#7dd3fc" stroke="#1f2937" stroke-width="2"/>'
+    '<text x="8" y="16" font-family="sans-serif" font-size="10" fill="#1f2937">78</text>'
+    '<text x="30" y="44" font-family="sans-serif" font-size="24" font-weight="bold" fill="#1f2937" text-anchor="middle">Pt</text>'
+    '<text x="68" y="27" font-family="sans-serif" font-size="13" font-weight="bold" fill="#1f2937">Periodic Table</text>'
+    '<text x="68" y="45" font-family="sans-serif" font-size="13" fill="#6b7280">Explorer</text>'
+    '</svg>'
+)
+_NO_IMAGE_SVG = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="150" height="150" viewBox="0 0 150 150">'
+    '<rect width="150" height="150" fill="#e5e7eb"/>'
+    '<text x="75" y="80" font-family="sans-serif" font-size="16" fill="#6b7280" text-anchor="middle">No Image</text>'
+    '</svg>'
+)
+
+_LEGEND_OPEN = "<div style='display: flex; flex-wrap: wrap; gap: 5px;'>"
+_LEGEND_ITEM_TMPL = "<div style='display: flex; align-items: center;'><div style='width: 10px; height: 10px; background-color: {color}; margin-right: 3px; border-radius: 2px;'></div><small>{label}</small></div>"
+
+
+@st.cache_data(show_spinner=False)
+def _legend_html(cats_tuple, truncated=False):
+    # Only a handful of distinct category sets occur in practice, so the markup is built once per set
+    legend_colors = colors_for_series(pd.Series(cats_tuple, dtype=object)).tolist()
+    parts = [_LEGEND_OPEN]
+    parts.extend(_LEGEND_ITEM_TMPL.format(color=color, label=str(cat).title()) for cat, color in zip(cats_tuple, legend_colors))
+    if truncated: parts.append("<small>...</small>")
+    parts.append("</div>")
+    return "".join(parts)
 
 
 # Main app logic
@@ -506,58 +754,60 @@ def main():
     if elements_df.empty:
         st.error("Element data could not be loaded. Application cannot proceed.")
         return
+    records_key = _records_fingerprint(elements_df)
+    # number -> record dict, so selection lookups are dict gets rather than boolean-mask scans
+    elements_by_number = _elements_by_number(records_key, elements_df)
 
     # --- Sidebar for Filtering ---
     with st.sidebar:
-        st.image("https://raw.githubusercontent.com/streamlit/streamlit/develop/components/python/streamlit/images/logo.svg", width=150) # Streamlit logo
+        st.image(_LOGO_SVG, width=150)
         st.markdown("## Filter Elements")
 
-        all_categories = sorted(elements_df['category'].dropna().unique())
+        # Categoricals keep their distinct values sorted, so the options need no per-rerun unique/sort
+        all_categories = elements_df['category'].cat.categories.tolist()
         selected_categories = st.multiselect("Category", all_categories, default=all_categories)
 
-        all_phases = sorted(elements_df['phase'].dropna().unique())
+        all_phases = elements_df['phase'].cat.categories.tolist()
         selected_phases = st.multiselect("Phase at STP", all_phases, default=all_phases)
         
         search_query = st.text_input("Search by Name or Symbol").lower()
 
-        filtered_elements_df = elements_df.copy()
-        if selected_categories:
-            filtered_elements_df = filtered_elements_df[filtered_elements_df['category'].isin(selected_categories)]
-        if selected_phases:
-            filtered_elements_df = filtered_elements_df[filtered_elements_df['phase'].isin(selected_phases)]
-        if search_query:
-            filtered_elements_df = filtered_elements_df[
-                filtered_elements_df['name'].str.lower().str.contains(search_query) |
-                filtered_elements_df['symbol'].str.lower().str.contains(search_query)
-            ]
+        # An empty or complete selection doesn't narrow anything, so it needs no mask
+        categories_differ = bool(selected_categories) and len(selected_categories) != len(all_categories)
+        phases_differ = bool(selected_phases) and len(selected_phases) != len(all_phases)
+
+        # Unfiltered view: filtered_numbers stays None, which the table overlay treats as "nothing dimmed"
+        filtered_numbers = None
+        unique_cats_in_view = elements_df['category'].unique()
+        if categories_differ or phases_differ or search_query:
+            filtered_numbers, unique_cats_in_view = _filter_elements(
+                records_key, elements_df,
+                tuple(selected_categories) if categories_differ else None,
+                tuple(selected_phases) if phases_differ else None,
+                search_query
+            )
         
         st.markdown("### Legend")
         # Create a more compact legend
-        legend_html = "<div style='display: flex; flex-wrap: wrap; gap: 5px;'>"
-        unique_cats_in_view = filtered_elements_df['category'].unique() if not filtered_elements_df.empty else all_categories
-        for cat in unique_cats_in_view[:10]: # Show up to 10 for brevity
-            color = state.get_element_color(cat)
-            legend_html += f"<div style='display: flex; align-items: center;'><div style='width: 10px; height: 10px; background-color: {color}; margin-right: 3px; border-radius: 2px;'></div><small>{str(cat).title()}</small></div>"
-        if len(unique_cats_in_view) > 10: legend_html += "<small>...</small>"
-        legend_html += "</div>"
+        if len(unique_cats_in_view) == 0:
+            unique_cats_in_view = all_categories
+        legend_html = _legend_html(tuple(sorted(unique_cats_in_view[:10])), len(unique_cats_in_view) > 10) # Show up to 10 for brevity
         st.markdown(legend_html, unsafe_allow_html=True)
 
         # Allow direct selection as a fallback or alternative
-        element_names_map = pd.Series(elements_df.number.values, index=elements_df.name).to_dict()
+        sorted_names, element_names_map = _element_name_lookups(records_key, elements_df)
         # Ensure selected_element_number corresponds to a valid name for the selectbox
-        current_selection_name = None
-        if st.session_state.selected_element_number:
-            match = elements_df[elements_df['number'] == st.session_state.selected_element_number]
-            if not match.empty:
-                current_selection_name = match.iloc[0]['name']
+        selected_element = elements_by_number.get(st.session_state.selected_element_number)
+        current_selection_name = selected_element['name'] if selected_element else None
         
         selected_name_from_box = st.selectbox(
             "Or Select Element:", 
-            options=elements_df['name'].sort_values().tolist(), 
-            index=elements_df['name'].sort_values().tolist().index(current_selection_name) if current_selection_name and current_selection_name in elements_df['name'].sort_values().tolist() else 0
+            options=sorted_names, 
+            index=sorted_names.index(current_selection_name) if current_selection_name in sorted_names else 0
         )
         if selected_name_from_box and (not current_selection_name or selected_name_from_box != current_selection_name) :
             st.session_state.selected_element_number = element_names_map[selected_name_from_box]
+            selected_element = elements_by_number.get(st.session_state.selected_element_number)
             # No st.rerun() here to avoid loop if selectbox itself causes a rerun
 
     # --- Main Content Area (Periodic Table and Details) ---
@@ -565,42 +815,43 @@ def main():
 
     with col_table:
         st.subheader("Periodic Table Grid")
-        plotly_fig = create_plotly_periodic_table_figure(elements_df, filtered_elements_df, st.session_state.selected_element_number)
-        
-        # Prepare data for the HTML component
-        fig_data_json = json.dumps(plotly_fig.data, cls=plotly.utils.PlotlyJSONEncoder)
-        fig_layout_json = json.dumps(plotly_fig.layout, cls=plotly.utils.PlotlyJSONEncoder)
-
-        component_html_rendered = PLOTLY_COMPONENT_HTML.replace("{fig_data_placeholder}", fig_data_json)
-        component_html_rendered = component_html_rendered.replace("{fig_layout_placeholder}", fig_layout_json)
-        
-        # Calculate dynamic height for component based on figure's layout height
-        dynamic_component_height = plotly_fig.layout.height if plotly_fig.layout and plotly_fig.layout.height else 600
-        
-        clicked_element_data = st.components.v1.html(component_html_rendered, height=dynamic_component_height + 40, scrolling=False)
-
-        if clicked_element_data and clicked_element_data.get("type") == "element_click":
-            clicked_number = clicked_element_data.get("number")
-            if clicked_number != st.session_state.selected_element_number:
-                 st.session_state.selected_element_number = clicked_number
-                 st.rerun() # Rerun to update selection and details pane
+        # Figure JSON is built once per dataset and sent once per session: component args go over the
+        # websocket on every rerun, so after the first send only the overlay is passed. An iframe that
+        # has no figure for fig_key (e.g. it was remounted) asks for it with a need_figure event.
+        fig_data_json, fig_layout_json, fig_height = _periodic_table_figure_json(records_key, elements_df)
+        send_figure = st.session_state.get('table_figure_sent') != records_key
+        table_event = _periodic_table_component(
+            fig_key=str(records_key),
+            fig_data=fig_data_json if send_figure else None,
+            fig_layout=fig_layout_json if send_figure else None,
+            overlay=_periodic_table_overlay_json(elements_df, filtered_numbers, st.session_state.selected_element_number),
+            frame_height=fig_height + 40,
+            key="periodic_table",
+            default=None
+        )
+        st.session_state.table_figure_sent = records_key
+
+        # The component keeps returning its last event on later reruns, so act on each event only once;
+        # otherwise a stale click would override a selection made in the sidebar
+        if isinstance(table_event, dict) and table_event.get("event_id") != st.session_state.get('last_table_event_id'):
+            st.session_state.last_table_event_id = table_event.get("event_id")
+            if table_event.get("type") == "need_figure":
+                del st.session_state.table_figure_sent
+                st.rerun() # Resend the figure
+            elif table_event.get("type") == "element_click":
+                clicked_number = table_event.get("number")
+                if clicked_number != st.session_state.selected_element_number:
+                     st.session_state.selected_element_number = clicked_number
+                     st.rerun() # Rerun to update selection and details pane
 
     with col_details:
         st.subheader("Element Details")
-        selected_element_series = None
-        if st.session_state.selected_element_number:
-            match = elements_df[elements_df['number'] == st.session_state.selected_element_number]
-            if not match.empty:
-                selected_element_series = match.iloc[0]
-        
-        display_element_details(selected_element_series, elements_df)
+        display_element_details(selected_element, elements_df)
 
     # Footer
     st.markdown("---")
     st.markdown("Developed with Streamlit | Data: [PeriodicTableJSON](https://github.com/Bowserinator/Periodic-Table-JSON) | Images: [images-of-elements.com](https://images-of-elements.com)")
 
 if __name__ == "__main__":
-    # Need to import plotly for the JSON encoder if not already globally imported
-    import plotly 
     main()
 